@@ -1,14 +1,26 @@
+import logging
+import httpx
+import orjson
 import streamlit as st
-from dataclasses import dataclass, asdict
-from typing import TypedDict
-from supabase import create_client, Client
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict, replace
+from threading import Lock, Thread
+from psycopg import Connection
+from psycopg.types.json import Jsonb, set_json_dumps, set_json_loads
+from psycopg_pool import ConnectionPool
+from supabase import create_client, Client, ClientOptions
 import streamlit.components.v1 as components
 
+logger = logging.getLogger(__name__)
+
 # --- Configuration and Constants ---
 REPORTS_TABLE = "reports"
 USERS_TABLE = "users"
 STATE_TABLE = "state"
-ANNOTATIONS_TABLE = "annotations"
+ANNOTATIONS_TABLE = "annotation_events"
+# Columns actually read by the app. Every user field is rendered, so users select all columns.
+REPORTS_COLUMNS = "id,title,creation_date,description"
+STATE_COLUMNS = "report_id,user_id,show_tutorial"
 
 
 @dataclass
@@ -18,12 +30,50 @@ class State:
     show_tutorial: bool
 
 
-class Annotation(TypedDict):
-    relevant_reports: list[int]
-    extras: dict[str, dict]
-
-
 DEFAULT_STATE = State(report_id=0, user_id=0, show_tutorial=True)
+# Moves the user's state to the next step and inserts a single annotation in one statement.
+# The state only moves if it is still at the step this session annotated, otherwise
+# (e.g. another tab got further) nothing is written and the statement returns false.
+# Annotating the same pair again replaces the extras, but a report once marked relevant
+# stays relevant.
+SAVE_ANNOTATION_SQL = f"""
+WITH updated AS (
+    UPDATE {STATE_TABLE}
+    SET report_id = %(next_report_id)s, user_id = %(next_user_id)s
+    WHERE user_uuid = %(user_uuid)s
+        AND report_id = %(state_report_id)s
+        AND user_id = %(state_user_id)s
+    RETURNING 1
+),
+annotation AS (
+    INSERT INTO {ANNOTATIONS_TABLE} (user_uuid, user_id, report_id, is_relevant, extras)
+    SELECT CAST(%(user_uuid)s AS uuid), %(user_id)s, %(report_id)s, %(is_relevant)s, %(extras)s
+    WHERE EXISTS (SELECT 1 FROM updated)
+    ON CONFLICT (user_uuid, user_id, report_id) DO UPDATE
+    SET is_relevant = {ANNOTATIONS_TABLE}.is_relevant OR EXCLUDED.is_relevant,
+        extras = EXCLUDED.extras
+)
+SELECT EXISTS (SELECT 1 FROM updated)
+"""
+# Loads the user's state row together with the report the state points at. The state row
+# is read once, so both come from the same row even if there are duplicates.
+# A missing state row comes back as NULL.
+BOOTSTRAP_SQL = f"""
+WITH s AS (
+    SELECT {STATE_COLUMNS} FROM {STATE_TABLE} WHERE user_uuid = %(user_uuid)s
+    ORDER BY ctid
+    LIMIT 1
+)
+SELECT
+    (SELECT to_jsonb(s) FROM s) AS state,
+    (SELECT to_jsonb(r) FROM (
+        SELECT {REPORTS_COLUMNS} FROM {REPORTS_TABLE} ORDER BY id
+        OFFSET COALESCE((SELECT report_id FROM s), 0)
+        LIMIT 1
+    ) r) AS report
+"""
+# Maximum number of reports kept in the shared report cache
+REPORT_CACHE_SIZE = 32
 
 
 # Initialize Supabase client
@@ -32,36 +82,67 @@ def init_supabase_client():
     """Initializes and returns the Supabase client."""
     url: str = st.secrets["SUPABASE_URL"]
     key: str = st.secrets["SUPABASE_KEY"]
-    return create_client(url, key)
+    # One HTTP/2 client with kept-alive connections shared by the REST and auth clients
+    http_client = httpx.Client(
+        http2=True,
+        limits=httpx.Limits(max_keepalive_connections=10, keepalive_expiry=60),
+        timeout=10,
+        follow_redirects=True,
+    )
+    return create_client(url, key, options=ClientOptions(httpx_client=http_client))
 
 
 supabase: Client = init_supabase_client()
 
 
-def load_state() -> State:
-    user_uuid: str = st.session_state.user.id
-    """Loads the application state (report and user index) from the Supabase database."""
-    try:
-        # Query the database for the single state row
-        response = (
-            supabase.table(STATE_TABLE).select("*").eq("user_uuid", user_uuid).execute()
-        )
+def configure_pg_connection(conn: Connection):
+    """Uses orjson for encoding and decoding JSON columns on a new pooled connection."""
+    set_json_dumps(orjson.dumps, conn)
+    set_json_loads(orjson.loads, conn)
 
-        # Check if data was returned
-        if response.data and len(response.data) > 0:
-            state_data = response.data[0]
-            # Convert values to int for session_state consistency
-            return State(
-                report_id=int(state_data.get("report_id", 0)),
-                user_id=int(state_data.get("user_id", 0)),
-                show_tutorial=state_data.get("show_tutorial", True),
-            )
-        else:
-            # state row not found
-            return create_state_row()
-    except Exception as e:
-        st.error(f"Error loading state from Supabase: {e}")
-        raise e
+
+# Initialize direct Postgres connection pool
+@st.cache_resource
+def init_pg_pool() -> ConnectionPool:
+    """Initializes and returns a pool of direct Postgres connections used for hot-path queries.
+
+    Called lazily where a connection is needed, so the login page doesn't read PG_DSN or connect.
+    """
+    return ConnectionPool(
+        conninfo=st.secrets["PG_DSN"],
+        min_size=1,
+        max_size=5,
+        # Prepared statements don't work through Supabase's transaction pooler
+        kwargs={"prepare_threshold": None},
+        configure=configure_pg_connection,
+        open=True,
+    )
+
+
+def select_bootstrap(
+    pool: ConnectionPool, user_uuid: str
+) -> tuple[dict | None, dict | None]:
+    """Queries the state row and current report in a single round-trip.
+
+    Safe to run outside the script thread.
+    """
+    with pool.connection() as conn:
+        return conn.execute(BOOTSTRAP_SQL, {"user_uuid": user_uuid}).fetchone()
+
+
+def load_state(state_data: dict | None) -> State:
+    """Builds the application state (report and user index) from the loaded state row."""
+    # Check if data was returned
+    if state_data:
+        # Convert values to int for session_state consistency
+        return State(
+            report_id=int(state_data.get("report_id", 0)),
+            user_id=int(state_data.get("user_id", 0)),
+            show_tutorial=state_data.get("show_tutorial", True),
+        )
+    else:
+        # state row not found
+        return create_state_row()
 
 
 def create_state_row():
@@ -74,7 +155,7 @@ def create_state_row():
         return DEFAULT_STATE
     except Exception as e:
         # It's helpful to log or display a temporary error if saving fails
-        print(f"Error saving state to Supabase: {e}")
+        logger.error("Error saving state to Supabase: %s", e)
         st.toast("Warning: Could not save progress to database!", icon="⚠️")
         raise e
 
@@ -82,115 +163,227 @@ def create_state_row():
 def save_state(state: State):
     """Saves the current application state to the Supabase database and updates session_state."""
     user_uuid: str = st.session_state.user.id
-    new_state: dict = asdict(state)
     try:
-        # Update the single state row based on its fixed ID
-        supabase.table(STATE_TABLE).update(new_state).eq(
-            "user_uuid", user_uuid
-        ).execute()
+        # Update the user's state row over a pooled connection
+        with init_pg_pool().connection() as conn:
+            conn.execute(
+                f"UPDATE {STATE_TABLE} SET report_id = %s, user_id = %s, show_tutorial = %s WHERE user_uuid = %s",
+                (state.report_id, state.user_id, state.show_tutorial, user_uuid),
+            )
 
     except Exception as e:
         # It's helpful to log or display a temporary error if saving fails
-        print(f"Error saving state to Supabase: {e}")
+        logger.error("Error saving state to Supabase: %s", e)
         st.toast("Warning: Could not save progress to database!", icon="⚠️")
         raise e
 
 
-def load_data() -> tuple[list[dict], list[dict]]:
+@st.cache_data(ttl=3600, show_spinner=False)
+def load_users() -> tuple[list[dict], dict[int, list[tuple[str, str]]]]:
+    """Loads users together with their displayed fields formatted as (field key, markdown) pairs.
+
+    Users are static, so both are cached across sessions and reruns.
+    """
     try:
-        # Query the database for the single state row
         response = supabase.table(USERS_TABLE).select("*").execute()
         if response.data and len(response.data) > 0:
             users = response.data
         else:
             raise RuntimeError("Users data row not found")
-        response = supabase.table(REPORTS_TABLE).select("*").execute()
-        if response.data and len(response.data) > 0:
-            reports = response.data
-        else:
-            raise RuntimeError("Reports data row not found")
-        return reports, users
     except Exception as e:
         st.error(f"Error loading data")
         raise e
+    user_fields = {
+        user["user_id"]: [
+            (key, f"**{key.replace('_', ' ').capitalize()}:** {value}")
+            for key, value in user.items()
+            if key not in ["user_id", "name"]
+        ]
+        for user in users
+    }
+    return users, user_fields
 
 
-def load_annotations(users: list[dict]) -> tuple[dict[str, Annotation], dict[str, int]]:
-    user_uuid: str = st.session_state.user.id
+@st.cache_data(ttl=300, show_spinner=False)
+def count_reports() -> int:
+    """Returns the number of reports without downloading them."""
     try:
-        # Query the database for the single state row
         response = (
-            supabase.table(ANNOTATIONS_TABLE)
-            .select("*")
-            .eq("user_uuid", user_uuid)
+            supabase.table(REPORTS_TABLE)
+            .select("id", count="exact", head=True)
             .execute()
         )
-        # Check if data was returned
-        if response.data and len(response.data) > 0:
-            # Convert values to int for session_state consistency
-            annotations_dict: dict[int, Annotation] = response.data[0].get("data", {})
-            if annotations_dict:
-                return annotations_dict
+        if response.count:
+            return response.count
         else:
-            # Annotation data row not found
-            create_annotation_row(users)
-        return {
-            user["user_id"]: {"relevant_reports": [], "extras": {}} for user in users
-        }
+            raise RuntimeError("Reports data row not found")
     except Exception as e:
-        st.error(f"Error loading annoations data from Supabase: {e}")
+        st.error(f"Error loading reports count from Supabase: {e}")
         raise e
 
 
-def create_annotation_row(users: list[dict]):
-    user_uuid: str = st.session_state.user.id
-    new_data_row = {
-        "data": {
-            user["user_id"]: {"relevant_reports": [], "extras": {}} for user in users
-        },
-        "user_uuid": user_uuid,
-        "notes": f"{st.session_state.user.email} results.",
-    }
+# Initialize cache of loaded and prefetched reports
+@st.cache_resource
+def init_report_cache() -> tuple[dict[int, dict], dict[int, object], Lock]:
+    """Initializes the report cache and the reports being prefetched, with a token per prefetch.
+
+    Both are shared by all sessions and background threads. Module globals are recreated
+    on every rerun, so they live in a cached resource.
+    """
+    return {}, {}, Lock()
+
+
+report_cache, reports_prefetching, report_cache_lock = init_report_cache()
+
+
+def select_report(index: int) -> dict | None:
+    """Queries the report at the given position, with reports ordered by ID.
+
+    Safe to run outside the script thread.
+    """
+    response = (
+        supabase.table(REPORTS_TABLE)
+        .select(REPORTS_COLUMNS)
+        .order("id")
+        .range(index, index)
+        .execute()
+    )
+    if not response.data:
+        return None
+    return response.data[0]
+
+
+def cache_report(index: int, report: dict, prefetch_token: object | None = None):
+    """Stores the report at the given position in the shared report cache.
+
+    A prefetched report is only stored if its prefetch wasn't invalidated in the meantime.
+    """
+    with report_cache_lock:
+        if prefetch_token is not None:
+            if reports_prefetching.get(index) is not prefetch_token:
+                return
+            del reports_prefetching[index]
+        report_cache.pop(index, None)
+        if len(report_cache) >= REPORT_CACHE_SIZE:
+            # Evict the least recently used entry, used entries are moved to the end
+            report_cache.pop(next(iter(report_cache)))
+        report_cache[index] = report
+
+
+def load_report(index: int) -> dict:
+    """Loads only the report at the given position, using the cache if it was already loaded."""
+    with report_cache_lock:
+        report = report_cache.pop(index, None)
+        if report is not None:
+            # Move the report to the end, so reports still on screen aren't evicted
+            report_cache[index] = report
+    if report is not None:
+        return report
     try:
-        # Update the single state row based on its fixed ID
-        supabase.table(ANNOTATIONS_TABLE).insert(new_data_row).execute()
-        return DEFAULT_STATE
+        report = select_report(index)
+        if report is not None:
+            cache_report(index, report)
+            return report
+        else:
+            raise RuntimeError(f"Report {index} not found")
     except Exception as e:
-        # It's helpful to log or display a temporary error if saving fails
-        print(f"Error saving annotations new row to Supabase: {e}")
-        st.toast("Warning: Could not save progress to database!", icon="⚠️")
+        st.error(f"Error loading report from Supabase: {e}")
         raise e
 
 
+def prefetch_report(index: int):
+    """Loads the report at the given position in a background thread if it isn't cached or loading yet."""
+    with report_cache_lock:
+        if index in report_cache or index in reports_prefetching:
+            return
+        prefetch_token = object()
+        reports_prefetching[index] = prefetch_token
+
+    def _prefetch():
+        report = None
+        try:
+            report = select_report(index)
+        except Exception as e:
+            # Not critical, load_report() will query the report again when it's needed
+            logger.warning("Error prefetching report %s: %s", index, e)
+        if report is not None:
+            cache_report(index, report, prefetch_token)
+        else:
+            with report_cache_lock:
+                if reports_prefetching.get(index) is prefetch_token:
+                    del reports_prefetching[index]
+
+    Thread(target=_prefetch, daemon=True).start()
+
+
 def save_annotation(
-    annotations: dict[int, Annotation],
     user_id: int,
     report_id: int,
     extras: dict,
     is_relevant: bool,
-):
-    """Adds a relevant report ID to a given user and saves the file."""
+    state: State,
+    next_state: State,
+) -> bool:
+    """Records the annotation of a report for a given user and saves the next state to the database.
+
+    Returns False without saving anything if the stored state is no longer at `state`.
+    """
     user_uuid: str = st.session_state.user.id
-    # Ensure we don't add duplicates
-    if is_relevant and report_id not in annotations[user_id]["relevant_reports"]:
-        annotations[user_id]["relevant_reports"].append(report_id)
-        annotations[user_id]["relevant_reports"] = list(
-            set(annotations[user_id]["relevant_reports"])
-        )
-    annotations[user_id]["extras"][report_id] = extras
     try:
-        # Update the single state row based on its fixed ID
-        supabase.table(ANNOTATIONS_TABLE).update({"data": annotations}).eq(
-            "user_uuid", user_uuid
-        ).execute()
+        # Insert only this annotation and update the state in the same round-trip
+        with init_pg_pool().connection() as conn:
+            (saved,) = conn.execute(
+                SAVE_ANNOTATION_SQL,
+                {
+                    "user_id": user_id,
+                    "report_id": report_id,
+                    "extras": Jsonb(extras),
+                    "is_relevant": bool(is_relevant),
+                    "user_uuid": user_uuid,
+                    "state_report_id": state.report_id,
+                    "state_user_id": state.user_id,
+                    "next_report_id": next_state.report_id,
+                    "next_user_id": next_state.user_id,
+                },
+            ).fetchone()
+        return saved
 
     except Exception as e:
         # It's helpful to log or display a temporary error if saving fails
-        print(f"Error saving annotations to Supabase: {e}")
+        logger.error("Error saving annotations to Supabase: %s", e)
         st.toast("Warning: Could not save progress to database!", icon="⚠️")
         raise e
 
 
+def fetch_all() -> tuple[int, list[dict], dict[int, list[tuple[str, str]]], State]:
+    """Loads reports count, users with their fields and state, running the independent queries concurrently.
+
+    State is read once per session, afterwards session_state is up to date.
+    """
+    if "state" in st.session_state:
+        users, user_fields = load_users()
+        return count_reports(), users, user_fields, st.session_state.state
+
+    user_uuid: str = st.session_state.user.id
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        # The worker thread only runs the bootstrap query, Streamlit calls stay in the script thread
+        pending_bootstrap = executor.submit(
+            select_bootstrap, init_pg_pool(), user_uuid
+        )
+        total_reports = count_reports()
+        users, user_fields = load_users()
+        try:
+            state_row, report = pending_bootstrap.result()
+        except Exception as e:
+            st.error(f"Error loading state from database: {e}")
+            raise e
+
+    st.session_state.state = load_state(state_row)
+    if report is not None:
+        cache_report(st.session_state.state.report_id, report)
+    return total_reports, users, user_fields, st.session_state.state
+
+
 def sign_in(email, password):
     """Attempts to sign in a user with email and password via Supabase."""
     try:
@@ -243,6 +436,7 @@ def sign_out():
         supabase.auth.sign_out()
         st.session_state.logged_in = False
         st.session_state.user = None
+        st.session_state.pop("state", None)
         st.session_state.report_idx = 0  # Reset state on logout if desired
         st.session_state.user_idx = 0  # Reset state on logout if desired
         st.toast("Successfully logged out.", icon="👋")
@@ -251,11 +445,15 @@ def sign_out():
         st.error(f"Logout failed: {e}")
 
 
+def is_admin() -> bool:
+    """Checks whether the signed-in user is listed in the ADMIN_EMAILS secret."""
+    return st.session_state.user.email in st.secrets.get("ADMIN_EMAILS", [])
+
+
 def scroll_to_top():
     js = """
     <script>
         var body = window.parent.document.querySelector(".main");
-        console.log(body);
         body.scrollTop = 0;
     </script>
     """
@@ -263,96 +461,17 @@ def scroll_to_top():
     st.components.v1.html(js)
 
 
-# --- Main application function ---
-
-
-def main():
-    st.set_page_config(layout="wide", page_title="CTI Annotation Tool")
-
-    st.markdown(
-        """
-    <style>
-    [data-testid="stMarkdownContainer"] ul{
-        padding-left:20px;
-    }
-
-    .stMainBlockContainer  {
-        padding-top: 3rem;
-    }
-    </style>
-    """,
-        unsafe_allow_html=True,
-    )
-
-    if "logged_in" not in st.session_state:
-        st.session_state.logged_in = False
-    if "user" not in st.session_state:
-        st.session_state.user = None  # Stores user object from Supabase
-
-    # --- Check Authentication and Control Access ---
-    if not st.session_state.logged_in:
-        # If not logged in, show the login UI and STOP the app execution.
-        show_auth_ui()
-        return  # STOP EXECUTION HERE!
+@st.fragment
+def show_annotation_ui(
+    users: list[dict], user_fields: dict[int, list[tuple[str, str]]], total_reports: int
+):
+    """Displays the current report and user with the annotation controls.
 
-    # Load data
-    reports, users = load_data()
-    total_reports = len(reports)
+    Runs as a fragment, so a click only reruns this part of the page instead of the whole app.
+    """
+    state: State = st.session_state.state
     total_users = len(users)
 
-    # Load state
-    state: State = load_state()
-    # Load annotations
-    annotations: dict[int, Annotation] = load_annotations(users)
-
-    # Get the current report and user
-    current_report = reports[state.report_id]
-    current_user = users[state.user_id]
-
-    # Check if the state file exists and if 'welcome_shown' is not in the session state
-    if state.show_tutorial:
-        # Display a title
-        st.title("Welcome to the data annotation tool! 👋")
-
-        # Display a markdown block with instructions
-        st.markdown(
-            """
-            This application is designed to easily annotate CTI reports relevance for a given user.
-            ### How to use the application?
-
-            It's simple! Your task is to evaluate whether a given CTI report is relevant for the displayed user.
-
-            1. **On the left side** you will find the full content of the report to analyze.
-
-            2. **On the right side** you can see the detailed user profile for whom you are making the evaluation.
-                Next to each data field there is a checkbox that indicates whether this piece of information is relevant to the report content or not.
-
-            3. **Below** use one of the two buttons:
-
-                * **✅ Relevant**: Click if you believe the report is important for this user.
-
-                * **❌ Irrelevant**: Click if the report is not important.
-
-            4. **At the bottom** there is a text field for optional additional comments. You can add any useful information here if you want.
-
-            The application automatically **saves your progress** after each click and moves on to the next task. You can close it at any time and come back to the same place later.
-            You can also see a progress bar at the top to keep track of the whole annotation process.
-            """
-        )
-
-        # If the "Let's start!" button is clicked
-        if st.button(
-            "Let's start annotating!", use_container_width=True, type="primary"
-        ):
-            state.show_tutorial = False
-            save_state(state)
-
-            # Rerun the app to show the main application
-            st.rerun()
-
-        # Stop further code execution until the button is pressed
-        return
-
     # Check if annotation is complete
     if state.report_id >= total_reports:
         st.success(
@@ -361,7 +480,9 @@ def main():
         st.balloons()
         return
 
-    # --- User Interface ---
+    # Get the current report and user
+    current_report = load_report(state.report_id)
+    current_user = users[state.user_id]
 
     # Display progress
     st.info(
@@ -381,14 +502,8 @@ def main():
         )
 
         # Create a scrollable container for the description
-        st.markdown(
-            f"""
-            <div style="height: 420px; overflow-y: scroll; border: 1px solid #e6e6e6; padding: 10px; border-radius: 5px;">
-            {current_report['description']}
-            </div>
-            """,
-            unsafe_allow_html=True,
-        )
+        with st.container(height=420, border=True):
+            st.markdown(current_report["description"])
 
     data_fields_relevancies: dict[str, bool] = {}
 
@@ -407,22 +522,19 @@ def main():
         with col_check:
             st.write("Is relevant?")
 
-        for key, value in current_user.items():
-            if key not in ["user_id", "name"]:
-                item_header = f"**{key.replace('_', ' ').capitalize()}:** "
+        for key, field_markdown in user_fields[current_user["user_id"]]:
+            col_check, col_text = st.columns(
+                [1, 10], gap=None, vertical_alignment="center", border=True
+            )
 
-                col_check, col_text = st.columns(
-                    [1, 10], gap=None, vertical_alignment="center", border=True
+            with col_check:
+                data_fields_relevancies[key] = st.checkbox(
+                    " ",
+                    key=f'{current_user["user_id"]}_{current_report["id"]}_{key}',
                 )
 
-                with col_check:
-                    data_fields_relevancies[key] = st.checkbox(
-                        " ",
-                        key=f'{current_user["user_id"]}_{current_report["id"]}_{key}',
-                    )
-
-                with col_text:
-                    st.markdown(item_header + str(value))
+            with col_text:
+                st.markdown(field_markdown)
 
     st.markdown("---")  # Separator
 
@@ -445,13 +557,21 @@ def main():
         height=200,
     )
 
+    # Load the next report while the current one is being annotated
+    if state.report_id + 1 < total_reports:
+        prefetch_report(state.report_id + 1)
+
     # --- Logic after button click ---
 
     if is_relevant or is_not_relevant:
-        # Load, update, and save annotations
-        annotations = load_annotations(users)
-        save_annotation(
-            annotations,
+        # Move to the next user or report
+        next_state = replace(state, user_id=state.user_id + 1)
+        if next_state.user_id >= total_users:
+            next_state.user_id = 0
+            next_state.report_id += 1
+
+        # Save the annotation together with the new state, then rerun only this fragment
+        saved = save_annotation(
             current_user["user_id"],
             current_report["id"],
             extras={
@@ -461,18 +581,117 @@ def main():
                 ],
             },
             is_relevant=is_relevant,
+            state=state,
+            next_state=next_state,
         )
+        if not saved:
+            # The progress was changed elsewhere, e.g. in another tab, so reload it
+            st.session_state.pop("state", None)
+            st.session_state.state_conflict = True
+            st.rerun()
+        st.session_state.state = next_state
         scroll_to_top()
+        st.rerun(scope="fragment")
 
-        # Move to the next user or report
-        state.user_id += 1
-        if state.user_id >= total_users:
-            state.user_id = 0
-            state.report_id += 1
 
-        # Save the new state and rerun the app
-        save_state(state)
-        st.rerun()
+# --- Main application function ---
+
+
+def main():
+    st.set_page_config(layout="wide", page_title="CTI Annotation Tool")
+
+    st.markdown(
+        """
+    <style>
+    [data-testid="stMarkdownContainer"] ul{
+        padding-left:20px;
+    }
+
+    .stMainBlockContainer  {
+        padding-top: 3rem;
+    }
+    </style>
+    """,
+        unsafe_allow_html=True,
+    )
+
+    if "logged_in" not in st.session_state:
+        st.session_state.logged_in = False
+    if "user" not in st.session_state:
+        st.session_state.user = None  # Stores user object from Supabase
+
+    # --- Check Authentication and Control Access ---
+    if not st.session_state.logged_in:
+        # If not logged in, show the login UI and STOP the app execution.
+        show_auth_ui()
+        return  # STOP EXECUTION HERE!
+
+    if is_admin():
+        with st.sidebar:
+            if st.button("🔄 Reload reports and users", use_container_width=True):
+                # Drop the cached rows of all sessions so that changes in the database are picked up
+                load_users.clear()
+                count_reports.clear()
+                with report_cache_lock:
+                    report_cache.clear()
+                    # Running prefetches may hold old reports, their results are dropped
+                    reports_prefetching.clear()
+                st.rerun()
+
+    # Load data and state (kept in session_state for the annotation fragment)
+    total_reports, users, user_fields, state = fetch_all()
+
+    if st.session_state.pop("state_conflict", False):
+        st.warning(
+            "Your progress was changed in another window, the last annotation was not saved. Continuing from the saved progress."
+        )
+
+    # Check if the state file exists and if 'welcome_shown' is not in the session state
+    if state.show_tutorial:
+        # Display a title
+        st.title("Welcome to the data annotation tool! 👋")
+
+        # Display a markdown block with instructions
+        st.markdown(
+            """
+            This application is designed to easily annotate CTI reports relevance for a given user.
+            ### How to use the application?
+
+            It's simple! Your task is to evaluate whether a given CTI report is relevant for the displayed user.
+
+            1. **On the left side** you will find the full content of the report to analyze.
+
+            2. **On the right side** you can see the detailed user profile for whom you are making the evaluation.
+                Next to each data field there is a checkbox that indicates whether this piece of information is relevant to the report content or not.
+
+            3. **Below** use one of the two buttons:
+
+                * **✅ Relevant**: Click if you believe the report is important for this user.
+
+                * **❌ Irrelevant**: Click if the report is not important.
+
+            4. **At the bottom** there is a text field for optional additional comments. You can add any useful information here if you want.
+
+            The application automatically **saves your progress** after each click and moves on to the next task. You can close it at any time and come back to the same place later.
+            You can also see a progress bar at the top to keep track of the whole annotation process.
+            """
+        )
+
+        # If the "Let's start!" button is clicked
+        if st.button(
+            "Let's start annotating!", use_container_width=True, type="primary"
+        ):
+            state.show_tutorial = False
+            save_state(state)
+
+            # Rerun the app to show the main application
+            st.rerun()
+
+        # Stop further code execution until the button is pressed
+        return
+
+    # --- User Interface ---
+    show_annotation_ui(users, user_fields, total_reports)
 
 
 if __name__ == "__main__":